@@ -142,6 +142,8 @@ class MCTS:
         """
         best_child = None
         best_val = -np.inf
+        idx_to_level = self.env.idx_to_level
+        parent_prog_lvl = idx_to_level[node['program_index']]
         # Iterate all the children to fill up the node dict and estimate Q val.
         # Then track the best child found according to the Q value estimation
         for child in node["childs"]:
@@ -151,8 +153,7 @@ class MCTS:
                 action_utility = (self.c_puct * child["prior"] * np.sqrt(node["visit_count"])
                                   * (1.0 / (1.0 + child["visit_count"])))
                 q_val_action += action_utility
-                parent_prog_lvl = self.env.programs_library[self.env.idx_to_prog[node['program_index']]]['level']
-                action_prog_lvl = self.env.programs_library[self.env.idx_to_prog[child['program_from_parent_index']]]['level']
+                action_prog_lvl = idx_to_level[child['program_from_parent_index']]
 
                 if parent_prog_lvl == action_prog_lvl:
                     # special treatment for calling the same program
@@ -232,7 +233,7 @@ class MCTS:
                 if program_to_call_index == self.env.programs_library['STOP']['index']:
                     stop = True
 
-                elif self.env.programs_library[program_to_call]['level'] == 0:
+                elif self.env.idx_to_level[program_to_call_index] == 0:
                     observation = self.env.act(program_to_call)
                     node['observation'] = observation
                     node['env_state'] = self.env.get_state()
@@ -148,7 +148,7 @@ class Policy(Module):
         Returns:
           policy loss, value loss, total loss combining policy and value losses
         """
-        e_t = torch.FloatTensor(np.stack(batch[0]))
+        e_t = torch.from_numpy(np.stack(batch[0]).astype(np.float32, copy=False))
         i_t = batch[1]
         lstm_states = batch[2]
         h_t, c_t = zip(*lstm_states)
@@ -183,10 +183,11 @@ class Policy(Module):
           the probabilities over programs)
 
         """
-        e_t = torch.FloatTensor(e_t)
+        # float32 observations are wrapped without copy
+        e_t = torch.from_numpy(np.asarray(e_t, dtype=np.float32))
         e_t, h, c = e_t.view(1, -1), h.view(1, -1), c.view(1, -1)
         with torch.no_grad():
-            e_t = e_t.to(device)
+            e_t = e_t.to(device, non_blocking=True)
             actor_out, critic_out, new_h, new_c = self.predict_on_batch(e_t, [i_t], h, c)
         return actor_out, critic_out, new_h, new_c
 
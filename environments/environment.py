@@ -28,7 +28,11 @@ class Environment(ABC):
                 program_mask[self.programs_library[program_name]['index']] = 1
 
         self.prog_to_idx = dict((prog, elems["index"]) for prog, elems in self.programs_library.items())
-        self.idx_to_prog = dict((idx, prog) for (prog, idx) in self.prog_to_idx.items())
+        # program indices range from 0 to the number of programs - 1, a list gives the reverse lookup directly
+        self.idx_to_prog = [None] * len(self.prog_to_idx)
+        for prog, idx in self.prog_to_idx.items():
+            self.idx_to_prog[idx] = prog
+        self.idx_to_level = [self.programs_library[prog]['level'] for prog in self.idx_to_prog]
 
         self.maximum_level = max([x['level'] for prog, x in self.programs_library.items()])
 
@@ -38,6 +42,9 @@ class Environment(ABC):
 
         self.has_been_reset = False
 
+        # mask of the programs whose precondition holds in the current state, None when it must be recomputed
+        self._valid_mask = None
+
     def get_maximum_level(self):
         """
         Returns the maximum program level.
@@ -102,8 +109,7 @@ class Environment(ABC):
         Returns:
             the level of the program
         """
-        program = self.get_program_from_index(program_index)
-        return self.programs_library[program]['level']
+        return self.idx_to_level[program_index]
 
     def get_reward(self):
         """Returns a reward for the current task at hand.
@@ -113,11 +119,21 @@ class Environment(ABC):
 
         """
         task_init_state = self.tasks_dict[len(self.tasks_list)]
-        state = self.get_state()
+        state = self.get_state_readonly()
         current_task = self.get_program_from_index(self.current_task_index)
         current_task_postcondition = self.prog_to_postcondition[current_task]
         return int(current_task_postcondition(task_init_state, state))
 
+    def get_state_readonly(self):
+        """Returns the current state for an immediate read-only use. Contrary to get_state, the returned state may
+        share memory with the environment: it must not be modified nor kept after the environment changes.
+        Environments can override it to avoid copying their state.
+
+        Returns:
+            the environment state
+        """
+        return self.get_state()
+
     def start_task(self, task_index):
         """Function used to begin a task. The task at hand defines the reward signal and stop boolean
         returned by the function step. This function resets the environment as well.
@@ -137,6 +153,7 @@ class Environment(ABC):
         if len(self.tasks_dict.keys()) == 0:
             # reset env
             self.reset_env()
+        self._valid_mask = None
 
         # store init state
         init_state = self.get_state()
@@ -155,11 +172,13 @@ class Environment(ABC):
         else:
             self.current_task_index = None
             self.has_been_reset = False
+        self._valid_mask = None
 
     def end_all_tasks(self):
         self.tasks_dict = {}
         self.tasks_list = []
         self.has_been_reset = False
+        self._valid_mask = None
 
     def act(self, primary_action):
         """Apply a primary action that modifies the environment.
@@ -174,6 +193,7 @@ class Environment(ABC):
         assert self.has_been_reset, 'Need to reset the environment before acting'
         assert primary_action in self.primary_actions, 'action {} is not defined'.format(primary_action)
         self.prog_to_func[primary_action]()
+        self._valid_mask = None
         return self.get_observation()
 
     def render(self):
@@ -194,12 +214,23 @@ class Environment(ABC):
         """
         program = self.get_program_from_index(program_index)
         assert program in self.mask, "Error program {} provided is level 0".format(program)
-        mask = self.mask[program].copy()
         # remove actions when pre-condition not satisfied
-        for program, program_dict in self.programs_library.items():
-            if not self.prog_to_precondition[program]():
-                mask[program_dict['index']] = 0
-        return mask
+        return self.mask[program] * self.get_valid_programs_mask()
+
+    def get_valid_programs_mask(self):
+        """Returns the mask of programs whose precondition is verified in the current state. The mask is computed
+        once and cached until the environment state changes (act, start_task, end_task, reset_env, reset_to_state).
+
+        Returns:
+            read-only boolean array indexed by program index
+        """
+        if self._valid_mask is None:
+            valid_mask = np.zeros(len(self.programs), dtype=np.bool_)
+            for program, program_dict in self.programs_library.items():
+                valid_mask[program_dict['index']] = self.prog_to_precondition[program]()
+            valid_mask.flags.writeable = False
+            self._valid_mask = valid_mask
+        return self._valid_mask
 
     @abstractmethod
     def compare_state(self, state1, state2):
@@ -64,7 +64,7 @@ class HanoiEnv(Environment):
                                  'STOP': {'level': -1, 'recursive': False},
                                  'HANOI': {'level': 1, 'recursive': True}}
 
-        for i, key in enumerate(sorted(list(self.programs_library.keys()))):
+        for i, key in enumerate(sorted(self.programs_library)):
             self.programs_library[key]['index'] = i
 
         self.prog_to_func = {
@@ -101,6 +101,7 @@ class HanoiEnv(Environment):
         self.pillars = ([], [], [])
         for i in range(1, self.n+1):
             self.pillars[src_pos].append(self.n - i)
+        self._valid_mask = None
         self.has_been_reset = True
 
     def _incr_n(self):
@@ -189,6 +190,7 @@ class HanoiEnv(Environment):
         self.roles = state[1].copy()
         self.n = state[2]
         self.init_roles_stack[-1] = state[3].copy()
+        self._valid_mask = None
 
     def compare_state(self, state1, state2):
         bool = True
@@ -1,14 +1,18 @@
 import numpy as np
 import torch
 import torch.nn as nn
-import torch.nn.functional as F
 from environments.environment import Environment
+from environments.utils import is_sorted, is_sorted_batch, PROG_TO_RESET_POINTERS
 
 
-class ListEnvEncoder(nn.Module):
+class ListEnvEncoder(torch.jit.ScriptModule):
     '''
     Implement an encoder (f_enc) specific to the List environment. It encodes observations e_t into
     vectors s_t of size D = encoding_dim.
+
+    The encoder is compiled with TorchScript: it is called at every step on a single observation, a regime in which
+    the Python dispatch of the layers costs more than the computation itself. It expects batched inputs of shape
+    (batch_size, observation_dim), batching observations (e.g. from a BatchListEnv) amortizes the call overhead.
     '''
 
     def __init__(self, observation_dim, encoding_dim):
@@ -16,12 +20,85 @@ class ListEnvEncoder(nn.Module):
         self.l1 = nn.Linear(observation_dim, 100)
         self.l2 = nn.Linear(100, encoding_dim)
 
+    @torch.jit.script_method
     def forward(self, x):
-        x = F.relu(self.l1(x))
-        x = torch.tanh(self.l2(x))
+        # activations are applied in place, the linear layers outputs are not used elsewhere
+        x = self.l1(x).relu_()
+        x = self.l2(x).tanh_()
         return x
 
 
+def build_programs_library(hierarchy=True):
+    """Builds the programs library of the list environments. Programs are indexed in the alphabetical order of their
+    names.
+
+    Args:
+      hierarchy: if False, the only non-zero program is BUBBLESORT (Default value = True)
+
+    Returns:
+      a dict mapping every program name to its level, recursive flag and index
+    """
+    if hierarchy:
+        programs_library = {'PTR_1_LEFT': {'level': 0, 'recursive': False},
+                            'STOP': {'level': -1, 'recursive': False},
+                            'PTR_2_LEFT': {'level': 0, 'recursive': False},
+                            'PTR_1_RIGHT': {'level': 0, 'recursive': False},
+                            'PTR_2_RIGHT': {'level': 0, 'recursive': False},
+                            'SWAP': {'level': 0, 'recursive': False},
+                            'RSHIFT': {'level': 1, 'recursive': False},
+                            'LSHIFT': {'level': 1, 'recursive': False},
+                            'COMPSWAP': {'level': 1, 'recursive': False},
+                            'RESET': {'level': 2, 'recursive': False},
+                            'BUBBLE': {'level': 2, 'recursive': False},
+                            'BUBBLESORT': {'level': 3, 'recursive': False}}
+    else:
+        # In no hierarchy mode, the only non-zero program is Bubblesort
+        programs_library = {'PTR_1_LEFT': {'level': 0, 'recursive': False},
+                            'STOP': {'level': -1, 'recursive': False},
+                            'PTR_2_LEFT': {'level': 0, 'recursive': False},
+                            'PTR_1_RIGHT': {'level': 0, 'recursive': False},
+                            'PTR_2_RIGHT': {'level': 0, 'recursive': False},
+                            'SWAP': {'level': 0, 'recursive': False},
+                            'BUBBLESORT': {'level': 1, 'recursive': False}}
+    for idx, key in enumerate(sorted(programs_library)):
+        programs_library[key]['index'] = idx
+    return programs_library
+
+
+def precondition_mask(p1_pos, p2_pos, length, programs_library):
+    """Evaluates the ListEnv preconditions of all the programs for several pointers positions at once. Used by
+    BatchListEnv, it must be kept in line with the ListEnv _*_precondition methods.
+
+    Args:
+      p1_pos: array of pointer 1 positions, one per state
+      p2_pos: array of pointer 2 positions, one per state
+      length: length of the lists
+      programs_library: ListEnv programs library, gives the column of each program
+
+    Returns:
+      a boolean array of shape (number of states, number of programs), True where the precondition holds
+
+    """
+    p1_pos, p2_pos = np.asarray(p1_pos), np.asarray(p2_pos)
+    always = np.ones(p1_pos.shape, dtype=np.bool_)
+    prog_to_condition = {'STOP': always,
+                         'PTR_1_LEFT': p1_pos > 0,
+                         'PTR_2_LEFT': p2_pos > 0,
+                         'PTR_1_RIGHT': p1_pos < length-1,
+                         'PTR_2_RIGHT': p2_pos < length-1,
+                         'SWAP': p1_pos != p2_pos,
+                         'COMPSWAP': (p1_pos < length-1) & ((p2_pos == p1_pos) | (p2_pos == p1_pos + 1)),
+                         'LSHIFT': (p1_pos > 0) | (p2_pos > 0),
+                         'RSHIFT': (p1_pos < length-1) | (p2_pos < length-1),
+                         'RESET': always,
+                         'BUBBLE': (p1_pos == 0) & ((p2_pos == 0) | (p2_pos == 1)),
+                         'BUBBLESORT': (p1_pos == 0) & (p2_pos == 0)}
+    mask = np.empty((p1_pos.shape[0], len(programs_library)), dtype=np.bool_)
+    for prog, elems in programs_library.items():
+        mask[:, elems['index']] = prog_to_condition[prog]
+    return mask
+
+
 class ListEnv(Environment):
     """Class that represents a list environment. It represents a list of size length of digits. The digits are 10-hot-encoded.
     There are two pointers, each one pointing on a list element. Both pointers can point on the same element.
@@ -41,28 +118,20 @@ class ListEnv(Environment):
 
         assert length > 0, "length must be a positive integer"
         self.length = length
-        self.scratchpad_ints = np.zeros((length,))
+        # digits are stored on a single byte, they are always between 0 and 9
+        self.scratchpad_ints = np.zeros((length,), dtype=np.uint8)
         self.p1_pos = 0
         self.p2_pos = 0
         self.encoding_dim = encoding_dim
         self.has_been_reset = False
+        # one hot encodings of the digits and observation buffer, allocated once and reused at every step
+        self._eye10 = np.eye(10, dtype=np.float32)
+        self._eye10.flags.writeable = False
+        self._obs_buf = np.empty(self.get_observation_dim(), dtype=np.float32)
+        self._sorted_cache = None
+        self.programs_library = build_programs_library(hierarchy)
 
         if hierarchy:
-            self.programs_library = {'PTR_1_LEFT': {'level': 0, 'recursive': False},
-                                     'STOP': {'level': -1, 'recursive': False},
-                                     'PTR_2_LEFT': {'level': 0, 'recursive': False},
-                                     'PTR_1_RIGHT': {'level': 0, 'recursive': False},
-                                     'PTR_2_RIGHT': {'level': 0, 'recursive': False},
-                                     'SWAP': {'level': 0, 'recursive': False},
-                                     'RSHIFT': {'level': 1, 'recursive': False},
-                                     'LSHIFT': {'level': 1, 'recursive': False},
-                                     'COMPSWAP': {'level': 1, 'recursive': False},
-                                     'RESET': {'level': 2, 'recursive': False},
-                                     'BUBBLE': {'level': 2, 'recursive': False},
-                                     'BUBBLESORT': {'level': 3, 'recursive': False}}
-            for idx, key in enumerate(sorted(list(self.programs_library.keys()))):
-                self.programs_library[key]['index'] = idx
-
             self.prog_to_func = {'STOP': self._stop,
                                  'PTR_1_LEFT': self._ptr_1_left,
                                  'PTR_2_LEFT': self._ptr_2_left,
@@ -91,18 +160,6 @@ class ListEnv(Environment):
                                           'BUBBLESORT': self._bubblesort_postcondition}
 
         else:
-            # In no hierarchy mode, the only non-zero program is Bubblesort
-
-            self.programs_library = {'PTR_1_LEFT': {'level': 0, 'recursive': False},
-                                     'STOP': {'level': -1, 'recursive': False},
-                                     'PTR_2_LEFT': {'level': 0, 'recursive': False},
-                                     'PTR_1_RIGHT': {'level': 0, 'recursive': False},
-                                     'PTR_2_RIGHT': {'level': 0, 'recursive': False},
-                                     'SWAP': {'level': 0, 'recursive': False},
-                                     'BUBBLESORT': {'level': 1, 'recursive': False}}
-            for idx, key in enumerate(sorted(list(self.programs_library.keys()))):
-                self.programs_library[key]['index'] = idx
-
             self.prog_to_func = {'STOP': self._stop,
                                  'PTR_1_LEFT': self._ptr_1_left,
                                  'PTR_2_LEFT': self._ptr_2_left,
@@ -164,7 +221,9 @@ class ListEnv(Environment):
 
     def _swap(self):
         """Swap the elements pointed by pointers 1 and 2."""
-        self.scratchpad_ints[[self.p1_pos, self.p2_pos]] = self.scratchpad_ints[[self.p2_pos, self.p1_pos]]
+        arr = self.scratchpad_ints
+        arr[self.p1_pos], arr[self.p2_pos] = arr[self.p2_pos], arr[self.p1_pos]
+        self._sorted_cache = None
 
     def _swap_precondition(self):
         return self.p1_pos != self.p2_pos
@@ -196,62 +255,47 @@ class ListEnv(Environment):
 
     def _compswap_postcondition(self, init_state, state):
         new_scratchpad_ints, new_p1_pos, new_p2_pos = init_state
-        new_scratchpad_ints = np.copy(new_scratchpad_ints)
         if new_p1_pos == new_p2_pos and new_p2_pos < self.length-1:
             new_p2_pos += 1
         idx_left = min(new_p1_pos, new_p2_pos)
         idx_right = max(new_p1_pos, new_p2_pos)
         if new_scratchpad_ints[idx_left] > new_scratchpad_ints[idx_right]:
-            new_scratchpad_ints[[idx_left, idx_right]] = new_scratchpad_ints[[idx_right, idx_left]]
+            new_scratchpad_ints = np.copy(new_scratchpad_ints)
+            new_scratchpad_ints[idx_left], new_scratchpad_ints[idx_right] = \
+                new_scratchpad_ints[idx_right], new_scratchpad_ints[idx_left]
         new_state = (new_scratchpad_ints, new_p1_pos, new_p2_pos)
         return self.compare_state(state, new_state)
 
-    def _lshift_postcondition(self, init_state, state):
-        init_scratchpad_ints, init_p1_pos, init_p2_pos = init_state
+    def _pointers_postcondition(self, init_state, state, new_p1_pos, new_p2_pos):
+        """Postcondition shared by the programs that only move the pointers (LSHIFT, RSHIFT and RESET): the pointers
+        must have reached the expected positions and the list must be unchanged."""
+        init_scratchpad_ints = init_state[0]
         scratchpad_ints, p1_pos, p2_pos = state
-        bool = np.array_equal(init_scratchpad_ints, scratchpad_ints)
-        if init_p1_pos > 0:
-            bool &= p1_pos == (init_p1_pos-1)
-        else:
-            bool &= p1_pos == init_p1_pos
-        if init_p2_pos > 0:
-            bool &= p2_pos == (init_p2_pos-1)
-        else:
-            bool &= p2_pos == init_p2_pos
-        return bool
+        return p1_pos == new_p1_pos and p2_pos == new_p2_pos and np.array_equal(init_scratchpad_ints, scratchpad_ints)
+
+    def _lshift_postcondition(self, init_state, state):
+        _, init_p1_pos, init_p2_pos = init_state
+        return self._pointers_postcondition(init_state, state, max(init_p1_pos-1, 0), max(init_p2_pos-1, 0))
 
     def _rshift_postcondition(self, init_state, state):
-        init_scratchpad_ints, init_p1_pos, init_p2_pos = init_state
-        scratchpad_ints, p1_pos, p2_pos = state
-        bool = np.array_equal(init_scratchpad_ints, scratchpad_ints)
-        if init_p1_pos < self.length-1:
-            bool &= p1_pos == (init_p1_pos+1)
-        else:
-            bool &= p1_pos == init_p1_pos
-        if init_p2_pos < self.length-1:
-            bool &= p2_pos == (init_p2_pos+1)
-        else:
-            bool &= p2_pos == init_p2_pos
-        return bool
+        _, init_p1_pos, init_p2_pos = init_state
+        return self._pointers_postcondition(init_state, state, min(init_p1_pos+1, self.length-1),
+                                            min(init_p2_pos+1, self.length-1))
 
     def _reset_postcondition(self, init_state, state):
-        init_scratchpad_ints, init_p1_pos, init_p2_pos = init_state
-        scratchpad_ints, p1_pos, p2_pos = state
-        bool = np.array_equal(init_scratchpad_ints, scratchpad_ints)
-        bool &= (p1_pos == 0 and p2_pos == 0)
-        return bool
+        return self._pointers_postcondition(init_state, state, 0, 0)
 
     def _bubblesort_postcondition(self, init_state, state):
         scratchpad_ints, p1_pos, p2_pos = state
         # check if list is sorted
-        return np.all(scratchpad_ints[:self.length-1] <= scratchpad_ints[1:self.length])
+        return is_sorted(scratchpad_ints)
 
     def _bubble_postcondition(self, init_state, state):
         new_scratchpad_ints, new_p1_pos, new_p2_pos = init_state
-        new_scratchpad_ints = np.copy(new_scratchpad_ints)
-        for idx in range(0, self.length-1):
-            if new_scratchpad_ints[idx+1] < new_scratchpad_ints[idx]:
-                new_scratchpad_ints[[idx, idx+1]] = new_scratchpad_ints[[idx+1, idx]]
+        # a single bubble pass carries the running maximum to the right: each cell ends up holding the smallest of
+        # the running maximum so far and its right neighbour, and the last cell holds the overall maximum
+        running_max = np.maximum.accumulate(new_scratchpad_ints)
+        new_scratchpad_ints = np.append(np.minimum(running_max[:-1], new_scratchpad_ints[1:]), running_max[-1])
         # bubble is expected to terminate with both pointers at the extreme left of the list
         new_p1_pos = self.length-1
         new_p2_pos = self.length-1
@@ -266,10 +310,13 @@ class ListEnv(Environment):
           basis:  (Default value = 10)
 
         Returns:
-          a numpy array representing the 10-hot-encoding of the digit
+          a numpy array representing the 10-hot-encoding of the digit, in basis 10 it is a read-only row of the
+          cached identity matrix
 
         """
-        encoding = np.zeros(basis)
+        if basis == 10:
+            return self._eye10[digit]
+        encoding = np.zeros(basis, dtype=np.float32)
         encoding[digit] = 1
         return encoding
 
@@ -283,44 +330,25 @@ class ListEnv(Environment):
           the digit encoded in one_encoding
 
         """
-        return np.argmax(one_encoding)
+        return int(one_encoding.argmax())
 
     def reset_env(self):
         """Reset the environment. The list are values are draw randomly. The pointers are initialized at position 0
         (at left position of the list).
 
         """
-        self.scratchpad_ints = np.random.randint(10, size=self.length)
+        self.scratchpad_ints = np.random.randint(10, size=self.length, dtype=np.uint8)
+        self._scratchpad_view = self.scratchpad_ints.view()
+        self._scratchpad_view.flags.writeable = False
         current_task_name = self.get_program_from_index(self.current_task_index)
-        if current_task_name == 'BUBBLE' or current_task_name == 'BUBBLESORT':
-            init_pointers_pos1 = 0
-            init_pointers_pos2 = 0
-        elif current_task_name == 'RESET':
-            while True:
-                init_pointers_pos1 = int(np.random.randint(0, self.length))
-                init_pointers_pos2 = int(np.random.randint(0, self.length))
-                if not (init_pointers_pos1 == 0 and init_pointers_pos2 == 0):
-                    break
-        elif current_task_name == 'LSHIFT':
-            while True:
-                init_pointers_pos1 = int(np.random.randint(0, self.length))
-                init_pointers_pos2 = int(np.random.randint(0, self.length))
-                if not (init_pointers_pos1 == 0 and init_pointers_pos2 == 0):
-                    break
-        elif current_task_name == 'RSHIFT':
-            while True:
-                init_pointers_pos1 = int(np.random.randint(0, self.length))
-                init_pointers_pos2 = int(np.random.randint(0, self.length))
-                if not (init_pointers_pos1 == self.length - 1 and init_pointers_pos2 == self.length - 1):
-                    break
-        elif current_task_name == 'COMPSWAP':
-            init_pointers_pos1 = int(np.random.randint(0, self.length - 1))
-            init_pointers_pos2 = int(np.random.choice([init_pointers_pos1, init_pointers_pos1 + 1]))
-        else:
+        if current_task_name not in PROG_TO_RESET_POINTERS:
             raise NotImplementedError('Unable to reset env for this program...')
+        init_pointers_pos1, init_pointers_pos2 = PROG_TO_RESET_POINTERS[current_task_name](self.length)
 
         self.p1_pos = init_pointers_pos1
         self.p2_pos = init_pointers_pos2
+        self._sorted_cache = None
+        self._valid_mask = None
         self.has_been_reset = True
 
     def get_state(self):
@@ -333,6 +361,17 @@ class ListEnv(Environment):
         assert self.has_been_reset, 'Need to reset the environment before getting states'
         return np.copy(self.scratchpad_ints), self.p1_pos, self.p2_pos
 
+    def get_state_readonly(self):
+        """Returns the current state without copying the scratchpad. The scratchpad is a read-only view on the
+        environment list, built once when the list is reset, it is only valid until the next action.
+
+        Returns:
+            the environment state
+
+        """
+        assert self.has_been_reset, 'Need to reset the environment before getting states'
+        return self._scratchpad_view, self.p1_pos, self.p2_pos
+
     def get_observation(self):
         """Returns an observation of the current state.
 
@@ -341,24 +380,18 @@ class ListEnv(Environment):
         """
         assert self.has_been_reset, 'Need to reset the environment before getting observations'
 
-        p1_val = self.scratchpad_ints[self.p1_pos]
-        p2_val = self.scratchpad_ints[self.p2_pos]
-        is_sorted = int(self._is_sorted())
-        pointers_same_pos = int(self.p1_pos == self.p2_pos)
-        pt_1_left = int(self.p1_pos == 0)
-        pt_2_left = int(self.p2_pos == 0)
-        pt_1_right = int(self.p1_pos == (self.length - 1))
-        pt_2_right = int(self.p2_pos == (self.length - 1))
-        p1p2 = np.eye(10)[[p1_val, p2_val]].reshape(-1)
-        bools = np.array([
-            pt_1_left,
-            pt_1_right,
-            pt_2_left,
-            pt_2_right,
-            pointers_same_pos,
-            is_sorted
-        ])
-        return np.concatenate((p1p2, bools), axis=0)
+        p1_pos, p2_pos, last_pos = self.p1_pos, self.p2_pos, self.length - 1
+        obs, eye10 = self._obs_buf, self._eye10
+        obs[:10] = eye10[self.scratchpad_ints[p1_pos]]
+        obs[10:20] = eye10[self.scratchpad_ints[p2_pos]]
+        obs[20] = p1_pos == 0
+        obs[21] = p1_pos == last_pos
+        obs[22] = p2_pos == 0
+        obs[23] = p2_pos == last_pos
+        obs[24] = p1_pos == p2_pos
+        obs[25] = self._is_sorted()
+        # observations are stored in the MCTS nodes, hence the buffer cannot be handed out directly
+        return obs.copy()
 
     def get_observation_dim(self):
         """
@@ -376,9 +409,13 @@ class ListEnv(Environment):
         reset the environment is the given state
 
         """
-        self.scratchpad_ints = state[0].copy()
+        self.scratchpad_ints = state[0].astype(np.uint8, copy=True)
+        self._scratchpad_view = self.scratchpad_ints.view()
+        self._scratchpad_view.flags.writeable = False
         self.p1_pos = state[1]
         self.p2_pos = state[2]
+        self._sorted_cache = None
+        self._valid_mask = None
 
     def _is_sorted(self):
         """Assert is the list is sorted or not.
@@ -389,8 +426,9 @@ class ListEnv(Environment):
             True if the list is sorted, False otherwise
 
         """
-        arr = self.scratchpad_ints
-        return np.all(arr[:-1] <= arr[1:])
+        if self._sorted_cache is None:
+            self._sorted_cache = is_sorted(self.scratchpad_ints)
+        return self._sorted_cache
 
     def get_state_str(self, state):
         """Print a graphical representation of the environment state"""
@@ -412,8 +450,253 @@ class ListEnv(Environment):
             True if both states are equals, False otherwise.
 
         """
-        bool = True
-        bool &= np.array_equal(state1[0], state2[0])
-        bool &= (state1[1] == state2[1])
-        bool &= (state1[2] == state2[2])
-        return bool
+        if state1[1] != state2[1] or state1[2] != state2[2]:
+            return False
+        scratchpad1, scratchpad2 = state1[0], state2[0]
+        return scratchpad1.shape == scratchpad2.shape and bool((scratchpad1 == scratchpad2).all())
+
+
+class BatchListEnv(object):
+    """Batch of independent list environments, used to play many rollouts in parallel. It applies the ListEnv primary
+    actions to every list of the batch at once.
+
+    The lists are stored as a single batch_size x length scratchpad and the pointers positions as two arrays of size
+    batch_size, so that every primary action and observation is computed with a few numpy calls over the whole batch
+    rather than with a Python loop over environments.
+
+    Actions are given as program indices, indexed as in the ListEnv programs library, so that the outputs of a policy
+    trained on ListEnv can be applied directly.
+    """
+
+    def __init__(self, batch_size=512, length=10, hierarchy=True):
+
+        assert batch_size > 0, "batch_size must be a positive integer"
+        assert length > 0, "length must be a positive integer"
+        self.batch_size = batch_size
+        self.length = length
+        self.scratchpad_ints = np.zeros((batch_size, length), dtype=np.uint8)
+        self.p1_pos = np.zeros(batch_size, dtype=np.int32)
+        self.p2_pos = np.zeros(batch_size, dtype=np.int32)
+        self.has_been_reset = False
+        # row indices shared by all the gathers and scatters over the batch
+        self._row_idx = np.arange(batch_size, dtype=np.int32)
+        self._eye10 = np.eye(10, dtype=np.float32)
+
+        self.programs_library = build_programs_library(hierarchy)
+
+        self.prog_to_func = {'STOP': self._stop,
+                             'PTR_1_LEFT': self._ptr_1_left,
+                             'PTR_2_LEFT': self._ptr_2_left,
+                             'PTR_1_RIGHT': self._ptr_1_right,
+                             'PTR_2_RIGHT': self._ptr_2_right,
+                             'SWAP': self._swap}
+        self.idx_to_func = dict((self.programs_library[prog]['index'], func)
+                                for prog, func in self.prog_to_func.items())
+
+        prog_to_postcondition = {'RSHIFT': self._rshift_postcondition,
+                                 'LSHIFT': self._lshift_postcondition,
+                                 'COMPSWAP': self._compswap_postcondition,
+                                 'RESET': self._reset_postcondition,
+                                 'BUBBLE': self._bubble_postcondition,
+                                 'BUBBLESORT': self._bubblesort_postcondition}
+        self.prog_to_postcondition = dict((prog, func) for prog, func in prog_to_postcondition.items()
+                                          if prog in self.programs_library)
+
+    def _stop(self, envs):
+        """Do nothing. The stop action does not modify the environments."""
+        pass
+
+    def _ptr_1_left(self, envs):
+        """Move pointer 1 to the left in the environments envs."""
+        self.p1_pos[envs] = np.maximum(self.p1_pos[envs] - 1, 0)
+
+    def _ptr_2_left(self, envs):
+        """Move pointer 2 to the left in the environments envs."""
+        self.p2_pos[envs] = np.maximum(self.p2_pos[envs] - 1, 0)
+
+    def _ptr_1_right(self, envs):
+        """Move pointer 1 to the right in the environments envs."""
+        self.p1_pos[envs] = np.minimum(self.p1_pos[envs] + 1, self.length - 1)
+
+    def _ptr_2_right(self, envs):
+        """Move pointer 2 to the right in the environments envs."""
+        self.p2_pos[envs] = np.minimum(self.p2_pos[envs] + 1, self.length - 1)
+
+    def _swap(self, envs):
+        """Swap the elements pointed by pointers 1 and 2 in the environments envs."""
+        p1_pos, p2_pos = self.p1_pos[envs], self.p2_pos[envs]
+        p1_vals = self.scratchpad_ints[envs, p1_pos]
+        self.scratchpad_ints[envs, p1_pos] = self.scratchpad_ints[envs, p2_pos]
+        self.scratchpad_ints[envs, p2_pos] = p1_vals
+
+    def get_precondition_mask(self):
+        """
+        Returns:
+            a batch_size x number of programs boolean array, True where the program precondition holds
+        """
+        return precondition_mask(self.p1_pos, self.p2_pos, self.length, self.programs_library)
+
+    def _compswap_postcondition(self, init_state, state):
+        init_scratchpad_ints, init_p1_pos, init_p2_pos = init_state
+        new_p2_pos = np.where((init_p1_pos == init_p2_pos) & (init_p2_pos < self.length-1), init_p2_pos+1, init_p2_pos)
+        idx_left = np.minimum(init_p1_pos, new_p2_pos)
+        idx_right = np.maximum(init_p1_pos, new_p2_pos)
+        # comparing and swapping the two elements leaves the smallest one on the left
+        left_vals = init_scratchpad_ints[self._row_idx, idx_left]
+        right_vals = init_scratchpad_ints[self._row_idx, idx_right]
+        new_scratchpad_ints = np.copy(init_scratchpad_ints)
+        new_scratchpad_ints[self._row_idx, idx_left] = np.minimum(left_vals, right_vals)
+        new_scratchpad_ints[self._row_idx, idx_right] = np.maximum(left_vals, right_vals)
+        new_state = (new_scratchpad_ints, init_p1_pos, new_p2_pos)
+        return self.compare_state(state, new_state)
+
+    def _lshift_postcondition(self, init_state, state):
+        init_scratchpad_ints, init_p1_pos, init_p2_pos = init_state
+        new_state = (init_scratchpad_ints, np.maximum(init_p1_pos-1, 0), np.maximum(init_p2_pos-1, 0))
+        return self.compare_state(state, new_state)
+
+    def _rshift_postcondition(self, init_state, state):
+        init_scratchpad_ints, init_p1_pos, init_p2_pos = init_state
+        new_state = (init_scratchpad_ints, np.minimum(init_p1_pos+1, self.length-1),
+                     np.minimum(init_p2_pos+1, self.length-1))
+        return self.compare_state(state, new_state)
+
+    def _reset_postcondition(self, init_state, state):
+        init_scratchpad_ints, init_p1_pos, init_p2_pos = init_state
+        new_state = (init_scratchpad_ints, np.zeros_like(init_p1_pos), np.zeros_like(init_p2_pos))
+        return self.compare_state(state, new_state)
+
+    def _bubblesort_postcondition(self, init_state, state):
+        scratchpad_ints, p1_pos, p2_pos = state
+        # check if lists are sorted
+        return is_sorted_batch(scratchpad_ints)
+
+    def _bubble_postcondition(self, init_state, state):
+        init_scratchpad_ints, init_p1_pos, init_p2_pos = init_state
+        # same closed form as ListEnv._bubble_postcondition, applied to every row
+        running_max = np.maximum.accumulate(init_scratchpad_ints, axis=1)
+        new_scratchpad_ints = np.concatenate((np.minimum(running_max[:, :-1], init_scratchpad_ints[:, 1:]),
+                                              running_max[:, -1:]), axis=1)
+        new_p1_pos = np.full_like(init_p1_pos, self.length-1)
+        new_p2_pos = np.full_like(init_p2_pos, self.length-1)
+        new_state = (new_scratchpad_ints, new_p1_pos, new_p2_pos)
+        return self.compare_state(state, new_state)
+
+    def get_postcondition_mask(self, program, init_state):
+        """
+        Args:
+            program: name of a non-primary program of the library
+            init_state: state of the environments when the program was called, as returned by get_state
+
+        Returns:
+            a boolean array stating for every environment whether the program postcondition holds in its current state
+        """
+        assert program in self.prog_to_postcondition, 'program {} has no postcondition'.format(program)
+        state = (self.scratchpad_ints, self.p1_pos, self.p2_pos)
+        return self.prog_to_postcondition[program](init_state, state)
+
+    def reset_env(self):
+        """Reset all the environments. The lists values are drawn randomly and the pointers are initialized at
+        position 0 (at left position of the lists).
+
+        """
+        self.scratchpad_ints = np.random.randint(10, size=(self.batch_size, self.length), dtype=np.uint8)
+        self.p1_pos[:] = 0
+        self.p2_pos[:] = 0
+        self.has_been_reset = True
+
+    def step(self, actions):
+        """Apply one primary action in each environment.
+
+        Args:
+          actions: array of size batch_size containing the index of the primary action to apply in each environment
+
+        Returns:
+          the observations of all the environments after the actions have been applied
+
+        """
+        assert self.has_been_reset, 'Need to reset the environments before acting'
+        actions = np.asarray(actions)
+        assert actions.shape == (self.batch_size,), 'one action per environment is expected'
+        action_indices = np.unique(actions)
+        for action_index in action_indices:
+            assert action_index in self.idx_to_func, 'action {} is not defined'.format(action_index)
+            if len(action_indices) == 1:
+                # all the environments apply the same action
+                envs = self._row_idx
+            else:
+                envs = np.flatnonzero(actions == action_index)
+            self.idx_to_func[action_index](envs)
+        return self.get_observation()
+
+    def get_state(self):
+        """Returns the current state of all the environments.
+
+        Returns:
+            the environments state
+
+        """
+        assert self.has_been_reset, 'Need to reset the environments before getting states'
+        return np.copy(self.scratchpad_ints), np.copy(self.p1_pos), np.copy(self.p2_pos)
+
+    def reset_to_state(self, state):
+        """
+
+        Args:
+          state: a given state of the environments
+        reset the environments in the given state
+
+        """
+        self.scratchpad_ints = state[0].copy()
+        self.p1_pos = state[1].copy()
+        self.p2_pos = state[2].copy()
+
+    def _is_sorted(self):
+        """
+        Returns:
+            a boolean array stating for every environment whether its list is sorted
+
+        """
+        return is_sorted_batch(self.scratchpad_ints)
+
+    def get_observation(self):
+        """Returns the observations of all the environments. Each row is built as in ListEnv.get_observation.
+
+        Returns:
+            a batch_size x observation_dim array
+        """
+        assert self.has_been_reset, 'Need to reset the environments before getting observations'
+        p1_vals = self.scratchpad_ints[self._row_idx, self.p1_pos]
+        p2_vals = self.scratchpad_ints[self._row_idx, self.p2_pos]
+        obs = np.empty((self.batch_size, self.get_observation_dim()), dtype=np.float32)
+        obs[:, :10] = self._eye10[p1_vals]
+        obs[:, 10:20] = self._eye10[p2_vals]
+        obs[:, 20] = self.p1_pos == 0
+        obs[:, 21] = self.p1_pos == (self.length - 1)
+        obs[:, 22] = self.p2_pos == 0
+        obs[:, 23] = self.p2_pos == (self.length - 1)
+        obs[:, 24] = self.p1_pos == self.p2_pos
+        obs[:, 25] = self._is_sorted()
+        return obs
+
+    def get_observation_dim(self):
+        """
+
+        Returns:
+            the size of the observation tensor of a single environment
+        """
+        return 2 * 10 + 6
+
+    def compare_state(self, state1, state2):
+        """
+        Compares two states of the environments.
+
+        Args:
+            state1: a state of the environments
+            state2: a state of the environments
+
+        Returns:
+            a boolean array stating for every environment whether its two states are equal
+        """
+        return ((state1[1] == state2[1]) & (state1[2] == state2[2])
+                & (state1[0] == state2[0]).all(axis=1))
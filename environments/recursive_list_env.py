@@ -3,6 +3,7 @@ import torch
 import torch.nn as nn
 import torch.nn.functional as F
 from environments.environment import Environment
+from environments.utils import is_sorted, PROG_TO_RESET_POINTERS
 
 
 class RecursiveListEnvEncoder(nn.Module):
@@ -29,11 +30,15 @@ class RecursiveListEnv(Environment):
         self.length = length
         self.start_pos = 0
         self.end_pos = length-1
-        self.scratchpad_ints = np.zeros((length,))
+        self.scratchpad_ints = np.zeros((length,), dtype=np.uint8)
         self.p1_pos = 0
         self.p2_pos = 0
         self.encoding_dim = encoding_dim
         self.has_been_reset = False
+        self._eye10 = np.eye(10, dtype=np.float32)
+        self._eye10.flags.writeable = False
+        self._obs_buf = np.empty(self.get_observation_dim(), dtype=np.float32)
+        self._sorted_cache = None
 
         self.programs_library = {'PTR_1_LEFT': {'level': 0, 'recursive': False},
                                  'STOP': {'level': -1, 'recursive': False},
@@ -48,7 +53,7 @@ class RecursiveListEnv(Environment):
                                  'BUBBLE': {'level': 2, 'recursive': True},
                                  'BUBBLESORT': {'level': 3, 'recursive': True}}
 
-        for i, key in enumerate(sorted(list(self.programs_library.keys()))):
+        for i, key in enumerate(sorted(self.programs_library)):
             self.programs_library[key]['index'] = i
 
         self.prog_to_func = {'STOP': self._stop,
@@ -154,7 +159,9 @@ class RecursiveListEnv(Environment):
 
     def _swap(self):
         assert self._swap_precondition(), 'precondition not verified'
-        self.scratchpad_ints[[self.p1_pos, self.p2_pos]] = self.scratchpad_ints[[self.p2_pos, self.p1_pos]]
+        arr = self.scratchpad_ints
+        arr[self.p1_pos], arr[self.p2_pos] = arr[self.p2_pos], arr[self.p1_pos]
+        self._sorted_cache = None
 
     def _swap_precondition(self):
         return self.p1_pos != self.p2_pos
@@ -168,58 +175,42 @@ class RecursiveListEnv(Environment):
 
     def _compswap_postcondition(self, init_state, state):
         new_scratchpad_ints, new_p1_pos, new_p2_pos, new_start_pos, new_end_pos = init_state
-        new_scratchpad_ints = np.copy(new_scratchpad_ints)
         if new_p1_pos == new_p2_pos and new_p2_pos < new_end_pos:
             new_p2_pos += 1
         idx_left = min(new_p1_pos, new_p2_pos)
         idx_right = max(new_p1_pos, new_p2_pos)
         if new_scratchpad_ints[idx_left] > new_scratchpad_ints[idx_right]:
-            new_scratchpad_ints[[idx_left, idx_right]] = new_scratchpad_ints[[idx_right, idx_left]]
+            new_scratchpad_ints = np.copy(new_scratchpad_ints)
+            new_scratchpad_ints[idx_left], new_scratchpad_ints[idx_right] = \
+                new_scratchpad_ints[idx_right], new_scratchpad_ints[idx_left]
         new_state = (new_scratchpad_ints, new_p1_pos, new_p2_pos, new_start_pos, new_end_pos)
         return self.compare_state(state, new_state)
 
-    def _lshift_postcondition(self, init_state, state):
-        init_scratchpad_ints, init_p1_pos, init_p2_pos, init_start_pos, init_end_pos = init_state
+    def _pointers_postcondition(self, init_state, state, new_p1_pos, new_p2_pos):
+        """Postcondition shared by the programs that only move the pointers (LSHIFT, RSHIFT and RESET): the pointers
+        must have reached the expected positions, the range and the list must be unchanged."""
+        init_scratchpad_ints, _, _, init_start_pos, init_end_pos = init_state
         scratchpad_ints, p1_pos, p2_pos, start_pos, end_pos = state
-        bool = np.array_equal(init_scratchpad_ints, scratchpad_ints)
-        bool &= init_start_pos == start_pos
-        bool &= init_end_pos == end_pos
-        if init_p1_pos > init_start_pos:
-            bool &= p1_pos == (init_p1_pos-1)
-        else:
-            bool &= p1_pos == init_p1_pos
-
-        if init_p2_pos > init_start_pos:
-            bool &= p2_pos == (init_p2_pos-1)
-        else:
-            bool &= p2_pos == init_p2_pos
+        return p1_pos == new_p1_pos and p2_pos == new_p2_pos and start_pos == init_start_pos \
+            and end_pos == init_end_pos and np.array_equal(init_scratchpad_ints, scratchpad_ints)
 
-        return bool
+    def _lshift_postcondition(self, init_state, state):
+        _, init_p1_pos, init_p2_pos, init_start_pos, _ = init_state
+        # a pointer moves left unless it is already at the start of the range
+        new_p1_pos = init_p1_pos-1 if init_p1_pos > init_start_pos else init_p1_pos
+        new_p2_pos = init_p2_pos-1 if init_p2_pos > init_start_pos else init_p2_pos
+        return self._pointers_postcondition(init_state, state, new_p1_pos, new_p2_pos)
 
     def _rshift_postcondition(self, init_state, state):
-        init_scratchpad_ints, init_p1_pos, init_p2_pos, init_start_pos, init_end_pos = init_state
-        scratchpad_ints, p1_pos, p2_pos, start_pos, end_pos = state
-        bool = np.array_equal(init_scratchpad_ints, scratchpad_ints)
-        bool &= init_start_pos == start_pos
-        bool &= init_end_pos == end_pos
-        if init_p1_pos < init_end_pos:
-            bool &= p1_pos == (init_p1_pos+1)
-        else:
-            bool &= p1_pos == init_p1_pos
-        if init_p2_pos < init_end_pos:
-            bool &= p2_pos == (init_p2_pos+1)
-        else:
-            bool &= p2_pos == init_p2_pos
-        return bool
+        _, init_p1_pos, init_p2_pos, _, init_end_pos = init_state
+        # a pointer moves right unless it is already at the end of the range
+        new_p1_pos = init_p1_pos+1 if init_p1_pos < init_end_pos else init_p1_pos
+        new_p2_pos = init_p2_pos+1 if init_p2_pos < init_end_pos else init_p2_pos
+        return self._pointers_postcondition(init_state, state, new_p1_pos, new_p2_pos)
 
     def _reset_postcondition(self, init_state, state):
-        init_scratchpad_ints, init_p1_pos, init_p2_pos, init_start_pos, init_end_pos = init_state
-        scratchpad_ints, p1_pos, p2_pos, start_pos, end_pos = state
-        bool = np.array_equal(init_scratchpad_ints, scratchpad_ints)
-        bool &= init_start_pos == start_pos
-        bool &= init_end_pos == end_pos
-        bool &= (p1_pos == start_pos and p2_pos == start_pos)
-        return bool
+        init_start_pos = init_state[3]
+        return self._pointers_postcondition(init_state, state, init_start_pos, init_start_pos)
 
     def _bubblesort_postcondition(self, init_state, state):
         init_scratchpad_ints, init_p1_pos, init_p2_pos, init_start_pos, init_end_pos = init_state
@@ -227,15 +218,17 @@ class RecursiveListEnv(Environment):
         bool = init_start_pos == start_pos
         bool &= init_end_pos == end_pos
         # check if list is sorted
-        bool &= np.all(scratchpad_ints[:end_pos] <= scratchpad_ints[(start_pos+1):(end_pos+1)])
+        bool &= is_sorted(scratchpad_ints[start_pos:end_pos+1])
         return bool
 
     def _bubble_postcondition(self, init_state, state):
         new_scratchpad_ints, new_p1_pos, new_p2_pos, new_start_pos, new_end_pos = init_state
         new_scratchpad_ints = np.copy(new_scratchpad_ints)
-        for idx in range(new_start_pos, new_end_pos):
-            if new_scratchpad_ints[idx+1] < new_scratchpad_ints[idx]:
-                new_scratchpad_ints[[idx, idx+1]] = new_scratchpad_ints[[idx+1, idx]]
+        # same closed form as ListEnv._bubble_postcondition, applied to [start_pos, end_pos]
+        segment = new_scratchpad_ints[new_start_pos:new_end_pos+1]
+        running_max = np.maximum.accumulate(segment)
+        new_scratchpad_ints[new_start_pos:new_end_pos] = np.minimum(running_max[:-1], segment[1:])
+        new_scratchpad_ints[new_end_pos] = running_max[-1]
         new_p1_pos = new_end_pos
         new_p2_pos = new_end_pos
         new_state = (new_scratchpad_ints, new_p1_pos, new_p2_pos, new_start_pos, new_end_pos)
@@ -281,10 +274,13 @@ class RecursiveListEnv(Environment):
           basis:  (Default value = 10)
 
         Returns:
-          a numpy array representing the 10-hot-encoding of the digit
+          a numpy array representing the 10-hot-encoding of the digit, in basis 10 it is a read-only row of the
+          cached identity matrix
 
         """
-        encoding = np.zeros(basis)
+        if basis == 10:
+            return self._eye10[digit]
+        encoding = np.zeros(basis, dtype=np.float32)
         encoding[digit] = 1
         return encoding
 
@@ -299,7 +295,7 @@ class RecursiveListEnv(Environment):
           the digit encoded in one_encoding
 
         """
-        return np.argmax(one_encoding)
+        return int(one_encoding.argmax())
 
     def reset_env(self):
         """Reset the environment. The list are values are draw randomly. The pointers are initialized at position 0
@@ -309,37 +305,18 @@ class RecursiveListEnv(Environment):
         assert self.length > 1, "list length must be greater than 1"
         self.start_pos = 0
         self.end_pos = self.length-1
-        self.scratchpad_ints = np.random.randint(10, size=self.length)
+        self.scratchpad_ints = np.random.randint(10, size=self.length, dtype=np.uint8)
+        self._scratchpad_view = self.scratchpad_ints.view()
+        self._scratchpad_view.flags.writeable = False
         current_task_name = self.get_program_from_index(self.current_task_index)
-        if current_task_name == 'BUBBLE' or current_task_name == 'BUBBLESORT':
-            init_pointers_pos1 = 0
-            init_pointers_pos2 = 0
-        elif current_task_name == 'RESET':
-            while True:
-                init_pointers_pos1 = int(np.random.randint(0, self.length))
-                init_pointers_pos2 = int(np.random.randint(0, self.length))
-                if not (init_pointers_pos1 == 0 and init_pointers_pos2 == 0):
-                    break
-        elif current_task_name == 'LSHIFT':
-            while True:
-                init_pointers_pos1 = int(np.random.randint(0, self.length))
-                init_pointers_pos2 = int(np.random.randint(0, self.length))
-                if not (init_pointers_pos1 == 0 and init_pointers_pos2 == 0):
-                    break
-        elif current_task_name == 'RSHIFT':
-            while True:
-                init_pointers_pos1 = int(np.random.randint(0, self.length))
-                init_pointers_pos2 = int(np.random.randint(0, self.length))
-                if not (init_pointers_pos1 == self.length - 1 and init_pointers_pos2 == self.length - 1):
-                    break
-        elif current_task_name == 'COMPSWAP':
-            init_pointers_pos1 = int(np.random.randint(0, self.length - 1))
-            init_pointers_pos2 = int(np.random.choice([init_pointers_pos1, init_pointers_pos1 + 1]))
-        else:
+        if current_task_name not in PROG_TO_RESET_POINTERS:
             raise NotImplementedError('Unable to reset env for this program...')
+        init_pointers_pos1, init_pointers_pos2 = PROG_TO_RESET_POINTERS[current_task_name](self.length)
 
         self.p1_pos = init_pointers_pos1
         self.p2_pos = init_pointers_pos2
+        self._sorted_cache = None
+        self._valid_mask = None
         self.has_been_reset = True
 
     def get_observation(self):
@@ -350,24 +327,18 @@ class RecursiveListEnv(Environment):
         """
         assert self.has_been_reset, 'Need to reset the environment before getting observations'
 
-        p1_val = self.scratchpad_ints[self.p1_pos]
-        p2_val = self.scratchpad_ints[self.p2_pos]
-        is_sorted = int(self._is_sorted())
-        pointers_same_pos = int(self.p1_pos == self.p2_pos)
-        pt_1_left = int(self.p1_pos == self.start_pos)
-        pt_2_left = int(self.p2_pos == self.start_pos)
-        pt_1_right = int(self.p1_pos == self.end_pos)
-        pt_2_right = int(self.p2_pos == self.end_pos)
-        p1p2 = np.eye(10)[[p1_val, p2_val]].reshape(-1)  # one hot encoding of values at pointers pos
-        bools = np.array([
-            pt_1_left,
-            pt_1_right,
-            pt_2_left,
-            pt_2_right,
-            pointers_same_pos,
-            is_sorted
-        ])
-        return np.concatenate((p1p2, bools), axis=0)
+        p1_pos, p2_pos, start_pos, end_pos = self.p1_pos, self.p2_pos, self.start_pos, self.end_pos
+        obs, eye10 = self._obs_buf, self._eye10
+        # one hot encoding of values at pointers pos
+        obs[:10] = eye10[self.scratchpad_ints[p1_pos]]
+        obs[10:20] = eye10[self.scratchpad_ints[p2_pos]]
+        obs[20] = p1_pos == start_pos
+        obs[21] = p1_pos == end_pos
+        obs[22] = p2_pos == start_pos
+        obs[23] = p2_pos == end_pos
+        obs[24] = p1_pos == p2_pos
+        obs[25] = self._is_sorted()
+        return obs.copy()
 
     def get_observation_dim(self):
         """
@@ -387,6 +358,17 @@ class RecursiveListEnv(Environment):
         assert self.has_been_reset, 'Need to reset the environment before getting states'
         return np.copy(self.scratchpad_ints), self.p1_pos, self.p2_pos, self.start_pos, self.end_pos
 
+    def get_state_readonly(self):
+        """Returns the current state without copying the scratchpad. The scratchpad is a read-only view on the
+        environment list, built once when the list is reset, it is only valid until the next action.
+
+        Returns:
+            the environment state
+
+        """
+        assert self.has_been_reset, 'Need to reset the environment before getting states'
+        return self._scratchpad_view, self.p1_pos, self.p2_pos, self.start_pos, self.end_pos
+
     def reset_to_state(self, state):
         """
 
@@ -395,11 +377,15 @@ class RecursiveListEnv(Environment):
         reset the environment is the given state
 
         """
-        self.scratchpad_ints = state[0].copy()
+        self.scratchpad_ints = state[0].astype(np.uint8, copy=True)
+        self._scratchpad_view = self.scratchpad_ints.view()
+        self._scratchpad_view.flags.writeable = False
         self.p1_pos = state[1]
         self.p2_pos = state[2]
         self.start_pos = state[3]
         self.end_pos = state[4]
+        self._sorted_cache = None
+        self._valid_mask = None
 
     def get_state_str(self, state):
         """Print a graphical representation of the environment state"""
@@ -425,12 +411,10 @@ class RecursiveListEnv(Environment):
             True if both states are equals, False otherwise.
 
         """
-        bool = np.array_equal(state1[0], state2[0])
-        bool &= (state1[1] == state2[1])
-        bool &= (state1[2] == state2[2])
-        bool &= (state1[3] == state2[3])
-        bool &= (state1[4] == state2[4])
-        return bool
+        if state1[1] != state2[1] or state1[2] != state2[2] or state1[3] != state2[3] or state1[4] != state2[4]:
+            return False
+        scratchpad1, scratchpad2 = state1[0], state2[0]
+        return scratchpad1.shape == scratchpad2.shape and bool((scratchpad1 == scratchpad2).all())
 
     def _is_sorted(self):
         """Assert is the list is sorted or not.
@@ -441,8 +425,9 @@ class RecursiveListEnv(Environment):
             True if the list is sorted, False otherwise
 
         """
-        arr = self.scratchpad_ints
-        return np.all(arr[:self.length-1] <= arr[1:self.length])
+        if self._sorted_cache is None:
+            self._sorted_cache = is_sorted(self.scratchpad_ints)
+        return self._sorted_cache
 
     def start_task(self, task_index):
         if self.tasks_list.count(task_index) > 0:
@@ -0,0 +1,58 @@
+import numpy as np
+import random
+from numba import njit
+
+
+@njit(cache=True)
+def is_sorted(arr):
+    """Returns True if the 1D array arr is sorted, stops at the first unordered pair."""
+    for i in range(arr.shape[0] - 1):
+        if arr[i] > arr[i + 1]:
+            return False
+    return True
+
+
+@njit(cache=True)
+def is_sorted_batch(arr):
+    """Returns a boolean array stating for every row of the 2D array arr whether it is sorted."""
+    out = np.empty(arr.shape[0], dtype=np.bool_)
+    for n in range(arr.shape[0]):
+        out[n] = True
+        for i in range(arr.shape[1] - 1):
+            if arr[n, i] > arr[n, i + 1]:
+                out[n] = False
+                break
+    return out
+
+
+def reset_pointers_at_start(length):
+    """Both pointers start at the left of the list."""
+    return 0, 0
+
+
+def reset_pointers_not_both_at_start(length):
+    """Draw the pointers positions uniformly among all the pairs except (0, 0). The pair is drawn as a single flat
+    index over length x length, index 0 being the excluded pair."""
+    return divmod(random.randrange(1, length * length), length)
+
+
+def reset_pointers_not_both_at_end(length):
+    """Draw the pointers positions uniformly among all the pairs except (length-1, length-1). The pair is drawn as a
+    single flat index over length x length, the last index being the excluded pair."""
+    return divmod(random.randrange(length * length - 1), length)
+
+
+def reset_pointers_compswap(length):
+    """Pointer 2 is either on pointer 1 or right after it. Pointer 1 position and the offset of pointer 2 are drawn
+    together as a single flat index over (length-1) x 2."""
+    init_pointers_pos1, offset = divmod(random.randrange(2 * (length - 1)), 2)
+    return init_pointers_pos1, init_pointers_pos1 + offset
+
+
+# maps a list task to the function drawing the initial pointers positions when the environment is reset
+PROG_TO_RESET_POINTERS = {'BUBBLE': reset_pointers_at_start,
+                          'BUBBLESORT': reset_pointers_at_start,
+                          'RESET': reset_pointers_not_both_at_start,
+                          'LSHIFT': reset_pointers_not_both_at_start,
+                          'RSHIFT': reset_pointers_not_both_at_end,
+                          'COMPSWAP': reset_pointers_compswap}
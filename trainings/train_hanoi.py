@@ -8,6 +8,7 @@ import torch
 import argparse
 import time
 import numpy as np
+import random
 from tensorboardX import SummaryWriter
 
 if __name__ == "__main__":
@@ -53,6 +54,7 @@ if __name__ == "__main__":
 
     # Set random seed
     np.random.seed(seed)
+    random.seed(seed)
     torch.manual_seed(seed)
 
     # Load env constants
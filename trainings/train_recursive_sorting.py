@@ -6,6 +6,7 @@ from core.trainer import Trainer
 from core.prioritized_replay_buffer import PrioritizedReplayBuffer
 import torch
 import numpy as np
+import random
 import argparse
 import time
 from tensorboardX import SummaryWriter
@@ -53,6 +54,7 @@ if __name__ == "__main__":
 
     # Set random seed
     np.random.seed(seed)
+    random.seed(seed)
     torch.manual_seed(seed)
 
     # Load environment constants
@@ -6,6 +6,7 @@ from core.trainer import Trainer
 from core.prioritized_replay_buffer import PrioritizedReplayBuffer
 import argparse
 import numpy as np
+import random
 import torch
 from tensorboardX import SummaryWriter
 import time
@@ -59,6 +60,7 @@ if __name__ == "__main__":
 
     # Set random seed
     np.random.seed(seed)
+    random.seed(seed)
     torch.manual_seed(seed)
 
     # Load environment constants
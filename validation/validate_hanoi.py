@@ -6,6 +6,7 @@ import torch
 import argparse
 from core.mcts import MCTS
 import numpy as np
+import random
 import time
 
 if __name__ == "__main__":
@@ -35,6 +36,7 @@ if __name__ == "__main__":
 
     # Set random seed
     np.random.seed(seed)
+    random.seed(seed)
     torch.manual_seed(seed)
 
     if save_results: